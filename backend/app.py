@@ -1,17 +1,164 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+from flask.json.provider import JSONProvider
+import json
+import orjson
 import pandas as pd
-from difflib import get_close_matches
+from rapidfuzz import process, fuzz
 from flask_cors import CORS
+import diskcache
+import functools
+import hashlib
+import logging
+import pygtrie
 import os
+import queue
+import threading
+from concurrent.futures import Future
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 import time
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson's native encoder/decoder."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+# orjson serializes the multi-KB answer bodies several times faster than
+# the stdlib json module Flask uses by default.
+app.json = OrjsonProvider(app)
 CORS(app, origins=["http://127.0.0.1:5500", "http://localhost:5500"])
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
+logger = logging.getLogger(__name__)
+
+# ---- GROQ MODEL ----
+# Build the client once so its HTTP connection is reused across requests
+# instead of paying session setup and a TLS handshake on every call.
+MODEL = None
+if os.getenv("GROQ_API_KEY"):
+    MODEL = ChatGroq(
+        model="llama-3.3-70b-versatile",
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        temperature=0
+    )
+else:
+    logger.warning("GROQ_API_KEY not found in environment variables")
+
+# ---- RESPONSE CACHE ----
+# Completed answers are cached on disk for a day, keyed on the normalized
+# question plus the retrieved context, so repeat questions skip the Groq
+# round-trip entirely.
+RESPONSE_CACHE = diskcache.Cache("/tmp/legalbot-cache")
+RESPONSE_CACHE_TTL_SECONDS = 86400
+
+def _response_cache_key(user_input, context):
+    return hashlib.blake2b(
+        (user_input.strip().lower() + "|" + context).encode()
+    ).hexdigest()
+
+# Prompt size drives LLM latency and cost, so cap both variable parts
+# rather than sending unbounded text.
+MAX_INPUT_CHARS = 2000
+MAX_CONTEXT_CHARS = 4000
+
+# ---- PROMPT TEMPLATE ----
+# Only the question and context vary per request, so keep the constant
+# text in module-level pieces and concatenate. Unlike the old f-string,
+# this has no leading indentation, which was being sent to the LLM as
+# pure whitespace tokens.
+PROMPT_PREFIX = (
+    "You are a legal assistant chatbot that specializes in the Constitution of India.\n"
+    "\n"
+    "User Question: "
+)
+PROMPT_MIDDLE = "\n\nConstitutional Context Available:\n"
+PROMPT_SUFFIX = (
+    "\n\nInstructions:\n"
+    "- Provide accurate information about Indian constitutional law\n"
+    "- If specific articles are mentioned in the context, reference them\n"
+    "- If the context is general, provide comprehensive information based on your knowledge\n"
+    "- Always include a clear disclaimer that this is not professional legal advice\n"
+    "- Suggest consulting a qualified lawyer for specific legal matters\n"
+    "- Keep the response educational, clear, and helpful\n"
+)
+
+# ---- REQUEST BATCHER ----
+# Concurrent /chat requests that arrive within a short window are grouped
+# into a single MODEL.batch() call, amortizing the per-request HTTP and
+# queuing overhead at the provider.
+BATCH_MAX_SIZE = 8
+BATCH_WINDOW_SECONDS = 0.02
+
+_batch_queue = queue.Queue()
+
+def _batch_worker():
+    while True:
+        batch = [_batch_queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+        while len(batch) < BATCH_MAX_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_batch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            responses = MODEL.batch([prompt for prompt, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            continue
+        for (_, future), response in zip(batch, responses):
+            future.set_result(response)
+
+if MODEL is not None:
+    threading.Thread(target=_batch_worker, daemon=True).start()
+
+def _invoke_model(prompt):
+    """Queue a prompt for the batch worker and block until its response."""
+    future = Future()
+    _batch_queue.put((prompt, future))
+    return future.result()
+
+# ---- SINGLEFLIGHT ----
+# When the same question is already in flight, later requests wait on the
+# first call's future instead of racing duplicate Groq calls.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _invoke_model_shared(key, prompt):
+    """Coalesce concurrent identical requests onto a single model call."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            leader = False
+        else:
+            future = Future()
+            _inflight[key] = future
+            leader = True
+
+    if not leader:
+        return future.result()
+
+    try:
+        response = _invoke_model(prompt)
+        future.set_result(response)
+        return response
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
 # Initialize dataframes as empty
 index_df = pd.DataFrame()
 constitution_df = pd.DataFrame()
@@ -22,65 +169,164 @@ try:
     current_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(current_dir, 'data')
     
-    print(f"Looking for data in: {data_dir}")
+    logger.info(f"Looking for data in: {data_dir}")
     
     # Check if data directory exists
     if os.path.exists(data_dir):
-        print(f"Files in data directory: {os.listdir(data_dir)}")
+        logger.info(f"Files in data directory: {os.listdir(data_dir)}")
         
-        # Load index.csv - it has different column names
-        index_path = os.path.join(data_dir, "index.csv")
-        if os.path.exists(index_path):
+        # Prefer Parquet (written by convert_to_parquet.py) - typed, compact,
+        # and no CSV text parsing on startup. Fall back to the CSVs.
+        index_parquet = os.path.join(data_dir, "Index.parquet")
+        index_path = os.path.join(data_dir, "Index.csv")
+        if os.path.exists(index_parquet):
+            index_df = pd.read_parquet(index_parquet)
+            logger.info(f"Index columns: {index_df.columns.tolist()}")
+        elif os.path.exists(index_path):
             index_df = pd.read_csv(index_path)
             # Your index.csv has: "Parts of the Indian Constitution", "Subject Mentioned in the Part", "Articles in Indian Constitution"
-            print(f"Index columns: {index_df.columns.tolist()}")
+            logger.info(f"Index columns: {index_df.columns.tolist()}")
         else:
-            print("index.csv not found")
-        
-        # Load constitution.csv - it has "Articles" column
+            logger.warning("index.csv not found")
+
+        constitution_parquet = os.path.join(data_dir, "Constitution Of India.parquet")
         constitution_path = os.path.join(data_dir, "Constitution Of India.csv")
-        if os.path.exists(constitution_path):
+        if os.path.exists(constitution_parquet):
+            # Only the "Articles" column is ever read, so project just that
+            constitution_df = pd.read_parquet(constitution_parquet, columns=["Articles"])
+            logger.info(f"Constitution columns: {constitution_df.columns.tolist()}")
+        elif os.path.exists(constitution_path):
             constitution_df = pd.read_csv(constitution_path)
             # Your constitution.csv has "Articles" column
-            print(f"Constitution columns: {constitution_df.columns.tolist()}")
+            logger.info(f"Constitution columns: {constitution_df.columns.tolist()}")
         else:
-            print("Constitution Of India.csv not found")
+            logger.warning("Constitution Of India.csv not found")
         time.sleep(1)    
-        print("Data loading completed!")
+        logger.info("Data loading completed!")
         
     else:
-        print("Data directory not found!")
+        logger.warning("Data directory not found!")
 
 except Exception as e:
-    print(f"Error loading CSV files: {e}")
+    logger.error(f"Error loading CSV files: {e}")
+
+# ---- PRECOMPUTED LOOKUPS ----
+# The data never changes after startup, so build these once instead of
+# re-scanning the dataframes on every request.
+AVAILABLE_HEADINGS = ()
+HEADING_ROWS = ()
+SAMPLE_CONTEXT = ""
+
+if not index_df.empty and "Subject Mentioned in the Part" in index_df.columns:
+    _headings = index_df["Subject Mentioned in the Part"].dropna()
+    AVAILABLE_HEADINGS = tuple(_headings.tolist())
+    HEADING_ROWS = tuple(_headings.index)
+
+# Lowercase the headings once so the matcher never casefolds the corpus
+# per query; positions map back to the original-cased rows.
+HEADINGS_LC = tuple(str(heading).lower() for heading in AVAILABLE_HEADINGS)
+
+# Inverted index: lowercased heading token -> positions of headings that
+# contain it. Lets the matcher score only headings sharing a token with
+# the query instead of the whole corpus.
+TOKEN_INDEX = {}
+for _pos, _heading in enumerate(HEADINGS_LC):
+    for _token in _heading.split():
+        TOKEN_INDEX.setdefault(_token, set()).add(_pos)
+
+# Character trie over lowercased headings for O(|query|) exact/prefix
+# lookups before any similarity scoring runs.
+HEADING_TRIE = pygtrie.CharTrie()
+for _pos, _heading in enumerate(HEADINGS_LC):
+    HEADING_TRIE[_heading] = _pos
+
+def _heading_line(pos):
+    """Format one index entry (part, subject, article range) for context."""
+    row = index_df.loc[HEADING_ROWS[pos]]
+    return (
+        f"{row['Parts of the Indian Constitution']} - "
+        f"{row['Subject Mentioned in the Part']} "
+        f"({row['Articles in Indian Constitution']})"
+    )
+
+if not constitution_df.empty:
+    if "Articles" in constitution_df.columns:
+        _content_list = constitution_df["Articles"].head(3).dropna().tolist()
+    else:
+        _content_list = constitution_df.iloc[:3, 0].dropna().tolist()
+    SAMPLE_CONTEXT = "\n\n".join(str(content) for content in _content_list)
 
 # ---- FIND RELEVANT CLAUSE FUNCTION ----
-def find_relevant_clause(query):
+@functools.lru_cache(maxsize=4096)
+def _find_relevant_clause(query):
     try:
-        print(f"Searching for query: {query}")
+        logger.debug("Searching for query: %s", query)
         
-        if index_df.empty or constitution_df.empty:
+        if not AVAILABLE_HEADINGS and not SAMPLE_CONTEXT:
             return "Constitutional database not available - using general knowledge."
-            
-        # Since your CSV structures don't match perfectly, use general approach
-        if not constitution_df.empty:
-            # Get some sample constitutional content
-            sample_content = constitution_df.iloc[:3]  # First 3 rows
-            if "Articles" in constitution_df.columns:
-                content_list = sample_content["Articles"].dropna().tolist()
-            else:
-                # Try first column if "Articles" doesn't exist
-                content_list = sample_content.iloc[:, 0].dropna().tolist()
-                
-            context = "\n\n".join([str(content) for content in content_list])
-            return f"Constitutional context:\n\n{context}"
+
+        # Fuzzy match the query against the index headings. RapidFuzz runs the
+        # scoring loop in native code, so this stays fast even for big indexes.
+        if AVAILABLE_HEADINGS:
+            # Trie fast path: if the query is, starts with, or is a prefix
+            # of a heading, answer without running the similarity loop.
+            query_lc = query.lower()
+            trie_positions = []
+            prefix_step = HEADING_TRIE.longest_prefix(query_lc)
+            if prefix_step:
+                trie_positions.append(prefix_step.value)
+            if HEADING_TRIE.has_subtrie(query_lc) or query_lc in HEADING_TRIE:
+                for _, pos in HEADING_TRIE.items(prefix=query_lc):
+                    if pos not in trie_positions:
+                        trie_positions.append(pos)
+            if trie_positions:
+                logger.debug("Trie hit for query: %s", query)
+                lines = [_heading_line(pos) for pos in trie_positions[:3]]
+                return "Relevant sections of the Constitution:\n\n" + "\n".join(lines)
+
+            # Exact-substring fast path: a verbatim hit inside a heading
+            # needs no fuzzy scoring at all.
+            exact_positions = [
+                pos for pos, heading in enumerate(HEADINGS_LC) if query_lc in heading
+            ]
+            if exact_positions:
+                logger.debug("Exact substring hit for query: %s", query)
+                lines = [_heading_line(pos) for pos in exact_positions[:3]]
+                return "Relevant sections of the Constitution:\n\n" + "\n".join(lines)
+
+            # Prefilter: only score headings that share a token with the
+            # query; fall back to the full corpus when none do.
+            candidates = set()
+            for token in query_lc.split():
+                candidates |= TOKEN_INDEX.get(token, set())
+            positions = sorted(candidates) if candidates else range(len(HEADINGS_LC))
+            matches = process.extract(
+                query_lc,
+                [HEADINGS_LC[pos] for pos in positions],
+                scorer=fuzz.WRatio,
+                limit=3,
+                score_cutoff=30
+            )
+            if matches:
+                logger.debug("Found %d matching headings", len(matches))
+                lines = [_heading_line(positions[pos]) for heading, score, pos in matches]
+                return "Relevant sections of the Constitution:\n\n" + "\n".join(lines)
+
+        # Fall back to general sample content when nothing matches
+        if SAMPLE_CONTEXT:
+            return f"Constitutional context:\n\n{SAMPLE_CONTEXT}"
         else:
             return "No constitutional data available."
             
     except Exception as e:
-        print(f"Error in find_relevant_clause: {e}")
+        logger.error("Error in find_relevant_clause: %s", e)
         return f"Error retrieving legal data: {str(e)}"
 
+def find_relevant_clause(query):
+    # Normalize the cache key so trivially different phrasings of the same
+    # question ("Citizenship", " citizenship ") hit the same entry.
+    return _find_relevant_clause(query.strip().lower())
+
 # ---- IMPROVED CHAT ROUTE ----
 @app.route("/chat", methods=["POST", "OPTIONS"])
 def chat():
@@ -91,51 +337,64 @@ def chat():
     if not user_input:
         return jsonify({"response": "Please enter a valid question."})
 
-    print(f"Received question: {user_input}")
+    user_input = user_input[:MAX_INPUT_CHARS]
+
+    logger.debug("Received question: %s", user_input)
 
     # Retrieve relevant part of constitution
-    context = find_relevant_clause(user_input)
+    context = find_relevant_clause(user_input)[:MAX_CONTEXT_CHARS]
 
-    # Initialize Groq client
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    
-    if not groq_api_key:
-        print("GROQ_API_KEY not found in environment variables")
+    if MODEL is None:
+        logger.error("GROQ_API_KEY not found in environment variables")
         return jsonify({"response": "Service configuration error. Please check API key."})
 
+    stream = bool(request.json.get("stream"))
+
+    cache_key = _response_cache_key(user_input, context)
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("Response cache hit")
+        if stream:
+            return Response(
+                f"data: {json.dumps(cached)}\n\ndata: [DONE]\n\n",
+                mimetype="text/event-stream"
+            )
+        return jsonify({"response": cached})
+
     try:
-        # Generate response with Groq
-        model = ChatGroq(
-            model="llama-3.3-70b-versatile",
-            groq_api_key=groq_api_key,
-            temperature=0
-        )
-        
-        prompt = f"""
-        You are a legal assistant chatbot that specializes in the Constitution of India.
-        
-        User Question: {user_input}
-
-        Constitutional Context Available:
-        {context}
-
-        Instructions:
-        - Provide accurate information about Indian constitutional law
-        - If specific articles are mentioned in the context, reference them
-        - If the context is general, provide comprehensive information based on your knowledge
-        - Always include a clear disclaimer that this is not professional legal advice
-        - Suggest consulting a qualified lawyer for specific legal matters
-        - Keep the response educational, clear, and helpful
-        """
-        
-        print("Sending request to Groq API...")
-        response = model.invoke(prompt)
-        print("Successfully received response from Groq API")
-        
+        prompt = PROMPT_PREFIX + user_input + PROMPT_MIDDLE + context + PROMPT_SUFFIX
+
+
+        if stream:
+            # Stream tokens as server-sent events so the client sees the
+            # first words at ~one-token latency instead of waiting for the
+            # whole generation.
+            def generate():
+                parts = []
+                try:
+                    for chunk in MODEL.stream(prompt):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield f"data: {json.dumps(chunk.content)}\n\n"
+                    if parts:
+                        RESPONSE_CACHE.set(cache_key, "".join(parts), expire=RESPONSE_CACHE_TTL_SECONDS)
+                except Exception as e:
+                    logger.error("Error streaming from Groq API: %s", e)
+                    yield f"data: {json.dumps('I am experiencing technical difficulties. Please try again in a moment.')}\n\n"
+                yield "data: [DONE]\n\n"
+
+            logger.debug("Streaming response from Groq API...")
+            return Response(stream_with_context(generate()), mimetype="text/event-stream")
+
+        logger.debug("Sending request to Groq API...")
+        response = _invoke_model_shared(cache_key, prompt)
+        logger.debug("Successfully received response from Groq API")
+
+        RESPONSE_CACHE.set(cache_key, response.content, expire=RESPONSE_CACHE_TTL_SECONDS)
         return jsonify({"response": response.content})
-    
+
     except Exception as e:
-        print(f"Error calling Groq API: {e}")
+        logger.error("Error calling Groq API: %s", e)
         return jsonify({"response": "I'm experiencing technical difficulties. Please try again in a moment."})
 
 # Test route
@@ -148,7 +407,13 @@ def home():
     })
 
 # ---- RUN SERVER ----
+# The block below is for local development only. In production run under
+# gunicorn with gevent workers so requests waiting on the Groq API don't
+# serialize behind the single-threaded dev server:
+#
+#   gunicorn -k gevent -w 4 --worker-connections 100 -b 0.0.0.0:5000 backend.app:app
+#
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    print(f"Starting LegalBot server on port {port}...")
+    logger.info("Starting LegalBot server on port %d...", port)
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""One-time conversion of the data CSVs to Parquet.
+
+The app prefers the .parquet files when they exist, which skips CSV text
+parsing on every startup and lets it read only the columns it uses.
+Re-run this after editing either CSV:
+
+    python backend/convert_to_parquet.py
+"""
+import os
+import pandas as pd
+
+def main():
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+    index_csv = os.path.join(data_dir, "Index.csv")
+    index_parquet = os.path.join(data_dir, "Index.parquet")
+    pd.read_csv(index_csv).to_parquet(index_parquet, index=False)
+    print(f"Wrote {index_parquet}")
+
+    constitution_csv = os.path.join(data_dir, "Constitution Of India.csv")
+    constitution_parquet = os.path.join(data_dir, "Constitution Of India.parquet")
+    pd.read_csv(constitution_csv).to_parquet(constitution_parquet, index=False)
+    print(f"Wrote {constitution_parquet}")
+
+if __name__ == "__main__":
+    main()